@@ -15,6 +15,7 @@ from homeassistant.components.history import sqlalchemy_filter_from_include_excl
 from homeassistant.components.http import HomeAssistantView
 from homeassistant.components.recorder.models import (
     Events,
+    StateAttributes,
     States,
     process_timestamp,
     process_timestamp_to_utc_isoformat,
@@ -440,6 +441,11 @@ def _get_events(
 
     with session_scope(hass=hass) as session:
         old_state = aliased(States, name="old_state")
+        # Attributes of newer states are shared through the
+        # state_attributes table, older rows still hold their own
+        attributes = sqlalchemy.func.coalesce(
+            StateAttributes.shared_attrs, States.attributes
+        )
 
         query = (
             session.query(
@@ -451,11 +457,15 @@ def _get_events(
                 States.state,
                 States.entity_id,
                 States.domain,
-                States.attributes,
+                attributes.label("attributes"),
             )
             .order_by(Events.time_fired)
             .outerjoin(States, (Events.event_id == States.event_id))
             .outerjoin(old_state, (States.old_state_id == old_state.state_id))
+            .outerjoin(
+                StateAttributes,
+                (States.attributes_id == StateAttributes.attributes_id),
+            )
             # The below filter, removes state change events that do not have
             # and old_state, new_state, or the old and
             # new state.
@@ -476,7 +486,7 @@ def _get_events(
             .filter(
                 (Events.event_type != EVENT_STATE_CHANGED)
                 | sqlalchemy.not_(States.domain.in_(CONTINUOUS_DOMAINS))
-                | sqlalchemy.not_(States.attributes.contains(UNIT_OF_MEASUREMENT_JSON))
+                | sqlalchemy.not_(attributes.contains(UNIT_OF_MEASUREMENT_JSON))
             )
             .filter(
                 Events.event_type.in_(ALL_EVENT_TYPES + list(hass.data.get(DOMAIN, {})))
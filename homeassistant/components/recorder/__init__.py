@@ -1,6 +1,6 @@
 """Support for recording details."""
 import asyncio
-from collections import namedtuple
+from collections import OrderedDict, namedtuple
 import concurrent.futures
 from datetime import datetime
 import logging
@@ -9,7 +9,7 @@ import threading
 import time
 from typing import Any, Callable, List, Optional
 
-from sqlalchemy import create_engine, event as sqlalchemy_event, exc, select
+from sqlalchemy import create_engine, event as sqlalchemy_event, exc, func, select
 from sqlalchemy.orm import scoped_session, sessionmaker
 from sqlalchemy.pool import StaticPool
 import voluptuous as vol
@@ -36,7 +36,7 @@ import homeassistant.util.dt as dt_util
 
 from . import migration, purge
 from .const import CONF_DB_INTEGRITY_CHECK, DATA_INSTANCE, DOMAIN, SQLITE_URL_PREFIX
-from .models import Base, Events, RecorderRuns, States
+from .models import Base, Events, RecorderRuns, StateAttributes, States
 from .util import session_scope, validate_or_move_away_sqlite_database
 
 _LOGGER = logging.getLogger(__name__)
@@ -60,6 +60,16 @@ DEFAULT_DB_MAX_RETRIES = 10
 DEFAULT_DB_RETRY_WAIT = 3
 KEEPALIVE_TIME = 30
 
+# Commit early when this many events are waiting to be written
+# so memory stays bounded with a long commit interval
+MAX_PENDING_EVENTS = 1000
+
+# Warn when the queue backlog grows beyond this size
+MAX_QUEUE_BACKLOG = 30000
+
+# Number of recently written state attributes to remember
+STATE_ATTRIBUTES_ID_CACHE_SIZE = 2048
+
 CONF_AUTO_PURGE = "auto_purge"
 CONF_DB_URL = "db_url"
 CONF_DB_MAX_RETRIES = "db_max_retries"
@@ -240,6 +250,10 @@ class Recorder(threading.Thread):
         self._timechanges_seen = 0
         self._keepalive_count = 0
         self._old_state_ids = {}
+        self._pending_events = []
+        self._entity_shared_attrs = {}
+        self._state_attributes_ids = OrderedDict()
+        self._backlog_warned = False
         self.event_session = None
         self.get_session = None
         self._completed_database_setup = False
@@ -256,6 +270,11 @@ class Recorder(threading.Thread):
 
         self.queue.put(PurgeTask(keep_days, repack))
 
+    @property
+    def backlog(self) -> int:
+        """Return the number of items waiting in the recorder queue."""
+        return self.queue.qsize()
+
     def run(self):
         """Start processing events to save."""
         tries = 1
@@ -380,44 +399,50 @@ class Recorder(threading.Thread):
                 if not self.entity_filter(entity_id):
                     continue
 
-            try:
-                dbevent = Events.from_event(event)
-                if event.event_type == EVENT_STATE_CHANGED:
-                    dbevent.event_data = "{}"
-                self.event_session.add(dbevent)
-                self.event_session.flush()
-            except (TypeError, ValueError):
-                _LOGGER.warning("Event is not JSON serializable: %s", event)
-            except Exception as err:  # pylint: disable=broad-except
-                # Must catch the exception to prevent the loop from collapsing
-                _LOGGER.exception("Error adding event: %s", err)
-
-            if dbevent and event.event_type == EVENT_STATE_CHANGED:
+            dbstate = None
+            shared_attrs = None
+            if event.event_type == EVENT_STATE_CHANGED:
                 try:
                     dbstate = States.from_event(event)
-                    has_new_state = event.data.get("new_state")
-                    dbstate.old_state_id = self._old_state_ids.get(dbstate.entity_id)
-                    if not has_new_state:
+                    if event.data.get("new_state"):
+                        shared_attrs = self._shared_attrs_from_event(event)
+                    else:
                         dbstate.state = None
-                    dbstate.event_id = dbevent.event_id
-                    self.event_session.add(dbstate)
-                    self.event_session.flush()
-                    if has_new_state:
-                        self._old_state_ids[dbstate.entity_id] = dbstate.state_id
-                    elif dbstate.entity_id in self._old_state_ids:
-                        del self._old_state_ids[dbstate.entity_id]
+                        self._entity_shared_attrs.pop(dbstate.entity_id, None)
                 except (TypeError, ValueError):
                     _LOGGER.warning(
                         "State is not JSON serializable: %s",
                         event.data.get("new_state"),
                     )
+                    continue
                 except Exception as err:  # pylint: disable=broad-except
                     # Must catch the exception to prevent the loop from collapsing
                     _LOGGER.exception("Error adding state change: %s", err)
+                    continue
+
+            try:
+                if dbstate is not None:
+                    # The state row holds the data of state_changed events
+                    dbevent = Events.from_event(event, event_data="{}")
+                else:
+                    dbevent = Events.from_event(event)
+            except (TypeError, ValueError):
+                _LOGGER.warning("Event is not JSON serializable: %s", event)
+                continue
+            except Exception as err:  # pylint: disable=broad-except
+                # Must catch the exception to prevent the loop from collapsing
+                _LOGGER.exception("Error adding event: %s", err)
+                continue
+
+            self._pending_events.append((dbevent, dbstate, shared_attrs))
 
             # If they do not have a commit interval
-            # than we commit right away
-            if not self.commit_interval:
+            # than we commit right away. Large batches
+            # are written early to bound memory use.
+            if (
+                not self.commit_interval
+                or len(self._pending_events) >= MAX_PENDING_EVENTS
+            ):
                 self._commit_event_session_or_retry()
 
     def _send_keep_alive(self):
@@ -462,12 +487,14 @@ class Recorder(threading.Thread):
             except Exception as err:  # pylint: disable=broad-except
                 # Must catch the exception to prevent the loop from collapsing
                 _LOGGER.exception("Error saving events: %s", err)
+                self._pending_events.clear()
                 return
 
         _LOGGER.error(
             "Error in database update. Could not save " "after %d tries. Giving up",
             tries,
         )
+        self._pending_events.clear()
         self._reopen_event_session()
 
     def _reopen_event_session(self):
@@ -491,12 +518,165 @@ class Recorder(threading.Thread):
 
     def _commit_event_session(self):
         try:
+            old_state_ids, attributes_ids = self._insert_pending_events()
             self.event_session.commit()
         except Exception as err:
             _LOGGER.error("Error executing query: %s", err)
             self.event_session.rollback()
             raise
 
+        self._pending_events.clear()
+        self._old_state_ids.update(old_state_ids)
+        for entity_id, state_id in old_state_ids.items():
+            if state_id is None:
+                del self._old_state_ids[entity_id]
+        self._state_attributes_ids.update(attributes_ids)
+        while len(self._state_attributes_ids) > STATE_ATTRIBUTES_ID_CACHE_SIZE:
+            self._state_attributes_ids.popitem(last=False)
+        self._check_backlog()
+
+    def _shared_attrs_from_event(self, event):
+        """Return the serialized attributes of a state_changed event.
+
+        The attributes of the previous state are reused when they did
+        not change, which is the case for most updates.
+        """
+        entity_id = event.data["entity_id"]
+        old_state = event.data.get("old_state")
+        shared_attrs = self._entity_shared_attrs.pop(entity_id, None)
+        if (
+            shared_attrs is None
+            or old_state is None
+            or old_state.attributes != event.data["new_state"].attributes
+        ):
+            shared_attrs = StateAttributes.shared_attrs_from_event(event)
+        self._entity_shared_attrs[entity_id] = shared_attrs
+        return shared_attrs
+
+    def _insert_pending_events(self):
+        """Write the buffered events and states with bulk inserts.
+
+        The primary keys are assigned here so that the links between
+        events and states, states and their attributes, and between a
+        state and its previous state can be resolved without flushing
+        every row individually.
+
+        The buffer is kept until the commit succeeds so a retried commit
+        writes the same rows again. Returns the changes to apply to the
+        old state ids and the state attributes cache once committed.
+        """
+        old_state_ids = {}
+        attributes_ids = {}
+        if not self._pending_events:
+            return old_state_ids, attributes_ids
+
+        session = self.event_session
+        event_id = session.query(func.max(Events.event_id)).scalar() or 0
+        state_id = None
+        attributes_id = None
+        dbevents = []
+        dbstates = []
+        dbattributes = []
+
+        for dbevent, dbstate, shared_attrs in self._pending_events:
+            event_id += 1
+            dbevent.event_id = event_id
+            dbevents.append(dbevent)
+
+            if dbstate is None:
+                continue
+
+            if state_id is None:
+                state_id = session.query(func.max(States.state_id)).scalar() or 0
+            entity_id = dbstate.entity_id
+            state_id += 1
+            dbstate.state_id = state_id
+            dbstate.event_id = event_id
+            if entity_id in old_state_ids:
+                dbstate.old_state_id = old_state_ids[entity_id]
+            else:
+                dbstate.old_state_id = self._old_state_ids.get(entity_id)
+            dbstates.append(dbstate)
+
+            if dbstate.state is None:
+                old_state_ids[entity_id] = None
+            else:
+                old_state_ids[entity_id] = state_id
+
+            if shared_attrs is None:
+                continue
+
+            if shared_attrs in attributes_ids:
+                dbstate.attributes_id = attributes_ids[shared_attrs]
+                continue
+
+            if shared_attrs in self._state_attributes_ids:
+                self._state_attributes_ids.move_to_end(shared_attrs)
+                dbstate.attributes_id = self._state_attributes_ids[shared_attrs]
+                continue
+
+            attributes_hash = StateAttributes.hash_shared_attrs(shared_attrs)
+            dbstate.attributes_id = self._find_shared_attrs(
+                session, shared_attrs, attributes_hash
+            )
+            if dbstate.attributes_id is None:
+                if attributes_id is None:
+                    attributes_id = (
+                        session.query(
+                            func.max(StateAttributes.attributes_id)
+                        ).scalar()
+                        or 0
+                    )
+                attributes_id += 1
+                dbstate.attributes_id = attributes_id
+                dbattributes.append(
+                    StateAttributes(
+                        attributes_id=attributes_id,
+                        hash=attributes_hash,
+                        shared_attrs=shared_attrs,
+                    )
+                )
+            attributes_ids[shared_attrs] = dbstate.attributes_id
+
+        if dbattributes:
+            session.bulk_save_objects(dbattributes)
+        session.bulk_save_objects(dbevents)
+        if dbstates:
+            session.bulk_save_objects(dbstates)
+        _LOGGER.debug(
+            "Inserted %d events, %d states and %d state attributes "
+            "(queue backlog: %d)",
+            len(dbevents),
+            len(dbstates),
+            len(dbattributes),
+            self.backlog,
+        )
+        return old_state_ids, attributes_ids
+
+    @staticmethod
+    def _find_shared_attrs(session, shared_attrs, attributes_hash):
+        """Find the id of attributes already stored in the database."""
+        for attributes_id, stored_attrs in session.query(
+            StateAttributes.attributes_id, StateAttributes.shared_attrs
+        ).filter(StateAttributes.hash == attributes_hash):
+            if stored_attrs == shared_attrs:
+                return attributes_id
+        return None
+
+    def _check_backlog(self):
+        """Warn once if the recorder is falling behind."""
+        backlog = self.backlog
+        if backlog > MAX_QUEUE_BACKLOG:
+            if not self._backlog_warned:
+                self._backlog_warned = True
+                _LOGGER.warning(
+                    "The recorder queue has %d events waiting to be written. "
+                    "The database is not keeping up with the event rate",
+                    backlog,
+                )
+        elif self._backlog_warned and backlog < MAX_QUEUE_BACKLOG // 2:
+            self._backlog_warned = False
+
     @callback
     def event_listener(self, event):
         """Listen for new events and put them in the process queue."""
@@ -7,7 +7,7 @@ from sqlalchemy.exc import OperationalError, SQLAlchemyError
 
 import homeassistant.util.dt as dt_util
 
-from .models import Events, RecorderRuns, States
+from .models import Events, RecorderRuns, StateAttributes, States
 from .util import execute, session_scope
 
 _LOGGER = logging.getLogger(__name__)
@@ -72,6 +72,23 @@ def purge_old_data(instance, purge_days: int, repack: bool) -> bool:
             )
             _LOGGER.debug("Deleted %s recorder_runs", deleted_rows)
 
+            # Attributes are shared between states so they can only be
+            # removed once no state refers to them anymore
+            deleted_rows = (
+                session.query(StateAttributes)
+                .filter(
+                    ~StateAttributes.attributes_id.in_(
+                        session.query(States.attributes_id).filter(
+                            States.attributes_id.isnot(None)
+                        )
+                    )
+                )
+                .delete(synchronize_session=False)
+            )
+            _LOGGER.debug("Deleted %s state_attributes", deleted_rows)
+            # pylint: disable=protected-access
+            instance._state_attributes_ids.clear()
+
         if repack:
             # Execute sqlite or postgresql vacuum command to free up space on disk
             if instance.engine.driver in ("pysqlite", "postgresql"):
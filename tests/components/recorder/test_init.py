@@ -14,7 +14,12 @@ from homeassistant.components.recorder import (
     run_information_with_session,
 )
 from homeassistant.components.recorder.const import DATA_INSTANCE
-from homeassistant.components.recorder.models import Events, RecorderRuns, States
+from homeassistant.components.recorder.models import (
+    Events,
+    RecorderRuns,
+    StateAttributes,
+    States,
+)
 from homeassistant.components.recorder.util import session_scope
 from homeassistant.const import MATCH_ALL, STATE_LOCKED, STATE_UNLOCKED
 from homeassistant.core import Context, callback
@@ -131,6 +136,8 @@ def _add_entities(hass, entity_ids):
 
 
 def _add_events(hass, events):
+    # Events are buffered until the next commit
+    wait_recording_done(hass)
     with session_scope(hass=hass) as session:
         session.query(Events).delete(synchronize_session=False)
     for event_type in events:
@@ -383,6 +390,68 @@ def test_saving_sets_old_state(hass_recorder):
         assert states[3].old_state_id == states[1].state_id
 
 
+def test_saving_links_states_in_one_commit(hass_recorder):
+    """Test states buffered in the same commit are linked to each other."""
+    hass = hass_recorder()
+
+    hass.states.set("test.one", "on", {})
+    hass.states.set("test.one", "off", {})
+    hass.states.set("test.one", "on", {})
+    hass.states.remove("test.one")
+    wait_recording_done(hass)
+
+    with session_scope(hass=hass) as session:
+        states = list(session.query(States))
+        assert len(states) == 4
+        assert {state.event_id for state in states} == {
+            event.event_id
+            for event in session.query(Events).filter_by(event_type="state_changed")
+        }
+
+        assert states[0].old_state_id is None
+        assert states[1].old_state_id == states[0].state_id
+        assert states[2].old_state_id == states[1].state_id
+        assert states[3].old_state_id == states[2].state_id
+        assert states[3].state is None
+
+    hass.states.set("test.one", "off", {})
+    wait_recording_done(hass)
+
+    with session_scope(hass=hass) as session:
+        states = list(session.query(States))
+        assert len(states) == 5
+        assert states[4].old_state_id is None
+
+    assert hass.data[DATA_INSTANCE].backlog == 0
+
+
+def test_saving_shares_state_attributes(hass_recorder):
+    """Test states with the same attributes share one attributes row."""
+    hass = hass_recorder()
+
+    hass.states.set("test.one", "on", {"friendly_name": "One"})
+    hass.states.set("test.one", "off", {"friendly_name": "One"})
+    hass.states.set("test.two", "on", {"friendly_name": "One"})
+    wait_recording_done(hass)
+    hass.states.set("test.one", "on", {"friendly_name": "One"})
+    hass.states.set("test.two", "off", {"friendly_name": "Two"})
+    wait_recording_done(hass)
+
+    with session_scope(hass=hass) as session:
+        states = list(session.query(States))
+        assert len(states) == 5
+        assert all(state.attributes is None for state in states)
+        assert len({state.attributes_id for state in states[:4]}) == 1
+        assert states[4].attributes_id != states[0].attributes_id
+
+        db_attributes = list(session.query(StateAttributes))
+        assert len(db_attributes) == 2
+        assert db_attributes[0].to_native() == {"friendly_name": "One"}
+        assert db_attributes[1].to_native() == {"friendly_name": "Two"}
+
+        assert states[4].to_native() == _state_empty_context(hass, "test.two")
+
+
 def test_saving_state_with_serializable_data(hass_recorder, caplog):
     """Test saving data that cannot be serialized does not crash."""
     hass = hass_recorder()
@@ -11,6 +11,7 @@ from homeassistant.components.recorder.models import (
     Base,
     Events,
     RecorderRuns,
+    StateAttributes,
     States,
     process_timestamp,
     process_timestamp_to_utc_isoformat,
@@ -92,6 +93,36 @@ class TestStates(unittest.TestCase):
         assert db_state.last_updated == event.time_fired
 
 
+class TestStateAttributes(unittest.TestCase):
+    """Test StateAttributes model."""
+
+    # pylint: disable=no-self-use
+
+    def test_from_event(self):
+        """Test converting event to shared db attributes."""
+        attrs = {"unit_of_measurement": "°C", "friendly_name": "Temperature"}
+        state = ha.State("sensor.temperature", "18", attrs)
+        event = ha.Event(
+            EVENT_STATE_CHANGED,
+            {"entity_id": "sensor.temperature", "old_state": None, "new_state": state},
+        )
+        shared_attrs = StateAttributes.shared_attrs_from_event(event)
+        db_attrs = StateAttributes(
+            shared_attrs=shared_attrs,
+            hash=StateAttributes.hash_shared_attrs(shared_attrs),
+        )
+        assert db_attrs.to_native() == attrs
+        assert db_attrs.hash == StateAttributes.hash_shared_attrs(
+            StateAttributes.shared_attrs_from_event(event)
+        )
+
+        db_state = States.from_event(event)
+        db_state.state_attributes = db_attrs
+        state.context = ha.Context(id=None)
+        assert db_state.attributes is None
+        assert db_state.to_native() == state
+
+
 class TestRecorderRuns(unittest.TestCase):
     """Test recorder run model."""
 
@@ -5,7 +5,12 @@ import unittest
 
 from homeassistant.components import recorder
 from homeassistant.components.recorder.const import DATA_INSTANCE
-from homeassistant.components.recorder.models import Events, RecorderRuns, States
+from homeassistant.components.recorder.models import (
+    Events,
+    RecorderRuns,
+    StateAttributes,
+    States,
+)
 from homeassistant.components.recorder.purge import purge_old_data
 from homeassistant.components.recorder.util import session_scope
 from homeassistant.util import dt as dt_util
@@ -147,6 +152,47 @@ class TestRecorderPurge(unittest.TestCase):
             assert finished
             assert states.count() == 2
 
+    def test_purge_old_state_attributes(self):
+        """Test deleting state attributes that are no longer used."""
+        now = datetime.now()
+        eleven_days_ago = now - timedelta(days=11)
+
+        self.hass.block_till_done()
+        self.hass.data[DATA_INSTANCE].block_till_done()
+        wait_recording_done(self.hass)
+
+        with recorder.session_scope(hass=self.hass) as session:
+            for attributes_id, timestamp in ((1000, eleven_days_ago), (1001, now)):
+                session.add(
+                    StateAttributes(
+                        attributes_id=attributes_id,
+                        hash=attributes_id,
+                        shared_attrs="{}",
+                    )
+                )
+                session.add(
+                    States(
+                        entity_id="test.recorder2",
+                        domain="sensor",
+                        state="on",
+                        attributes_id=attributes_id,
+                        last_changed=timestamp,
+                        last_updated=timestamp,
+                        created=timestamp,
+                    )
+                )
+
+        with session_scope(hass=self.hass) as session:
+            state_attributes = session.query(StateAttributes).filter(
+                StateAttributes.attributes_id >= 1000
+            )
+            assert state_attributes.count() == 2
+
+            while not purge_old_data(self.hass.data[DATA_INSTANCE], 4, repack=False):
+                pass
+
+            assert [attrs.attributes_id for attrs in state_attributes] == [1001]
+
     def test_purge_old_events(self):
         """Test deleting old events."""
         self._add_test_events()
@@ -233,6 +279,6 @@ class TestRecorderPurge(unittest.TestCase):
                 self.hass.data[DATA_INSTANCE].block_till_done()
                 wait_recording_done(self.hass)
                 assert (
-                    mock_logger.debug.mock_calls[5][1][0]
+                    mock_logger.debug.mock_calls[6][1][0]
                     == "Vacuuming SQL DB to free space"
                 )